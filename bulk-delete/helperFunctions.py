@@ -1,14 +1,236 @@
+import asyncio
+import dbm
+import logging
+import logging.handlers
+import shelve
+import time
+from collections import namedtuple
+from dataclasses import dataclass
+from urllib.parse import urlencode
+import aiohttp
+import orjson
+from aiolimiter import AsyncLimiter
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SNYK_API_URL = "https://api.snyk.io"
+SNYK_REST_VERSION = "2023-06-19"
+
+logger = logging.getLogger("snyk-bulk-delete")
+
+#number of times a rate limited (429) request is sent before giving up
+MAX_TRIES = 5
+
+#the project fields used by the filters, built from the REST API projects payload
+Project = namedtuple("Project", ["id", "name", "type", "origin", "created", "isMonitored"])
+
+#the org fields used by the script, kept instead of the pysnyk objects so orgs can be cached
+Org = namedtuple("Org", ["id", "slug", "name"])
+
+#number of projects/orgs per action, only the counts are reported so no project objects are kept
+#field names are <projects|orgs>_<action>, the summary printed at the end of a run relies on it
+@dataclass(slots=True)
+class Results:
+    projects_skipped: int = 0
+    projects_deactivated: int = 0
+    projects_deleted: int = 0
+    projects_failed: int = 0
+    orgs_deleted: int = 0
+    orgs_failed: int = 0
+    orgs_errored: int = 0
+
+#API types of the non open source snyk products, any other type is an open source project
+_TYPE_TO_PRODUCT = {
+    **{inputType: "container" for inputType in ("deb", "linux", "dockerfile", "rpm", "apk")},
+    **{inputType: "iac" for inputType in ("k8sconfig", "helmconfig", "terraformconfig", "armconfig", "cloudformationconfig")},
+    "sast": "sast",
+}
+
 #converts API types into a snyk product
 def convertTypeToProduct(inputType):
-    containerTypes = ["deb", "linux", "dockerfile", "rpm", "apk"]
-    iacTypes = ["k8sconfig", "helmconfig", "terraformconfig", "armconfig", "cloudformationconfig"]
-    codeTypes = ["sast"]
-
-    if inputType in containerTypes:
-        return "container"
-    elif inputType in iacTypes:
-        return "iac"
-    elif inputType in codeTypes:
-        return "sast"
-    else:
-        return "opensource"
\ No newline at end of file
+    return _TYPE_TO_PRODUCT.get(inputType, "opensource")
+
+#limits the number of API requests in flight and the number of requests sent per minute
+#staying just under the snyk rate limit avoids bursts of 429 responses
+class Throttle:
+    def __init__(self, maxConnections, requestsPerMinute):
+        self.semaphore = asyncio.Semaphore(maxConnections)
+        self.limiter = AsyncLimiter(requestsPerMinute, 60)
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        await self.semaphore.acquire()
+
+    async def __aexit__(self, *excInfo):
+        self.semaphore.release()
+
+#logging handler that writes records through the spinner so log lines do not collide with its animation
+#debug records are buffered and written together so a burst of them redraws the spinner once, other records flush right away
+class SpinnerHandler(logging.handlers.BufferingHandler):
+    def __init__(self, spinner, capacity=100):
+        super().__init__(capacity)
+        self.spinner = spinner
+
+    def shouldFlush(self, record):
+        return len(self.buffer) >= self.capacity or record.levelno > logging.DEBUG
+
+    def flush(self):
+        with self.lock:
+            if len(self.buffer) == 0:
+                return
+            try:
+                self.spinner.write("\n".join(self.format(record) for record in self.buffer))
+            except Exception:
+                self.handleError(self.buffer[-1])
+            self.buffer.clear()
+
+#on disk cache of API listings so back to back runs (i.e. dry runs while tuning filters) skip the network
+#entries are stored as {"ts", "payload"} and are fresh for ttl seconds, stale entries are only served when the API fails
+#entries older than maxStale seconds are never served and are dropped when the cache is opened
+#the cache is only an optimization, opening it raises dbm.error (which covers OSError) and every other failure is a cache miss
+class ListingCache:
+    def __init__(self, path, ttl, maxStale):
+        self.ttl = ttl
+        self.maxStale = maxStale
+        #an exclusive lock keeps concurrent runs from sharing the dbm file, the second run fails to open the cache
+        self.lockFile = open(f"{path}.lock", "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.db = shelve.open(path)
+        except BaseException:
+            self.lockFile.close()
+            raise
+        self.prune()
+
+    #drops every entry too old to be served, even as a stale fallback
+    def prune(self):
+        try:
+            expired = [key for key in self.db.keys() if time.time() - self.db[key]["ts"] > self.maxStale]
+            for key in expired:
+                del self.db[key]
+        except Exception:
+            pass
+
+    def get(self, key, allowStale=False):
+        try:
+            entry = self.db.get(key)
+        except Exception:
+            return None
+        if entry is None or time.time() - entry["ts"] > (self.maxStale if allowStale else self.ttl):
+            return None
+        return entry["payload"]
+
+    def set(self, key, payload):
+        try:
+            self.db[key] = {"ts": time.time(), "payload": payload}
+        except dbm.error:
+            pass
+
+    #drops every entry whose key starts with prefix
+    def invalidate(self, prefix):
+        try:
+            for key in [key for key in self.db.keys() if key.startswith(prefix)]:
+                del self.db[key]
+        except dbm.error:
+            pass
+
+    def close(self):
+        self.db.close()
+        self.lockFile.close()
+
+#awaits call() and retries it with exponential backoff while snyk responds with 429
+#the Retry-After header is honoured when present, the throttle is released while waiting
+async def withRetry(call, maxTries=MAX_TRIES):
+    delay = 1.0
+    for attempt in range(1, maxTries + 1):
+        try:
+            return await call()
+        except aiohttp.ClientResponseError as err:
+            if err.status != 429 or attempt == maxTries:
+                raise
+            try:
+                wait = float(err.headers.get("Retry-After", delay)) if err.headers else delay
+            except ValueError:
+                wait = delay
+            await asyncio.sleep(wait)
+            delay *= 2
+
+#converts a project returned by the REST API into a Project
+def toProject(restProject):
+    attributes = restProject["attributes"]
+    return Project(restProject["id"], attributes["name"], attributes["type"], attributes["origin"], attributes["created"], attributes["status"] == "active")
+
+#converts a REST API pagination link into an absolute url
+def restUrl(link):
+    if link.startswith("http"):
+        return link
+    if link.startswith("/rest"):
+        return SNYK_API_URL + link
+    return SNYK_API_URL + "/rest" + link
+
+#yields every project in an org page by page, following the REST API pagination links
+#projects are handed out as soon as their page arrives so peak memory stays at one page
+#pages are cached one by one under "projects:<org id>:" when a cache is given
+#filters are extra query parameters (i.e. origins or types) the API filters the listing with
+#allowStale serves an expired cached page when the API is unreachable or fails with a 5xx, only safe when nothing is acted on
+async def iterOrgProjects(sess, throttle, orgId, pageSize=100, cache=None, filters=None, allowStale=False):
+    url = f"{SNYK_API_URL}/rest/orgs/{orgId}/projects"
+    params = {"version": SNYK_REST_VERSION, "limit": pageSize, **(filters or {})}
+    while url:
+        key = f"projects:{orgId}:{url}?{urlencode(params)}" if params else f"projects:{orgId}:{url}"
+        page = cache.get(key) if cache is not None else None
+        if page is None:
+            async def fetchPage():
+                async with throttle:
+                    async with sess.get(url, params=params) as resp:
+                        #orjson parses the raw bytes without decoding the body into a str first
+                        return orjson.loads(await resp.read())
+            try:
+                restPage = await withRetry(fetchPage)
+                nextLink = restPage.get("links", {}).get("next")
+                page = {"projects": [toProject(restProject) for restProject in restPage["data"]], "next": nextLink}
+                if cache is not None:
+                    cache.set(key, page)
+            except aiohttp.ClientError as err:
+                #fall back to a stale copy of the page if the API is unavailable, client errors (4xx) are never masked
+                if isinstance(err, aiohttp.ClientResponseError) and err.status < 500:
+                    raise
+                page = cache.get(key, allowStale=True) if cache is not None and allowStale else None
+                if page is None:
+                    raise
+                logger.warning("Listing projects of org %s failed (%s), using a stale cached page", orgId, err)
+        for project in page["projects"]:
+            yield project
+        #the next link already carries the version and cursor parameters
+        url = restUrl(page["next"]) if page["next"] else None
+        params = None
+
+#applies an action ("delete" or "deactivate") to a single project through the v1 API
+async def applyProjectAction(sess, throttle, orgId, project, action):
+    url = f"{SNYK_API_URL}/v1/org/{orgId}/project/{project.id}"
+    async def send():
+        async with throttle:
+            if action == "delete":
+                async with sess.delete(url):
+                    pass
+            else:
+                async with sess.post(f"{url}/deactivate", json={}):
+                    pass
+    await withRetry(send)
+
+#applies an action to a batch of projects and returns the projects that failed
+#snyk has no bulk project endpoint so the calls are issued concurrently, bounded by the throttle
+async def applyProjectActions(sess, throttle, orgId, projects, action):
+    outcomes = await asyncio.gather(*[applyProjectAction(sess, throttle, orgId, project, action) for project in projects], return_exceptions=True)
+    return [project for project, outcome in zip(projects, outcomes) if isinstance(outcome, Exception)]
+
+#deletes an org through the v1 API
+async def deleteOrg(sess, throttle, orgId):
+    async def send():
+        async with throttle:
+            async with sess.delete(f"{SNYK_API_URL}/v1/org/{orgId}"):
+                pass
+    await withRetry(send)
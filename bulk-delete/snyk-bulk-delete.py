@@ -1,37 +1,62 @@
-import sys, getopt, os, snyk
+import sys, argparse, os, re, snyk
+import hashlib
+import dbm
+import asyncio
+import logging
+import aiohttp
+import dataclasses
 from yaspin import yaspin
 from helperFunctions import *
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 
-helpString ='''--help : Returns this page \n--force : By default this script will perform a dry run, add this flag to actually apply changes\n--delete : By default this script will deactivate projects, add this flag to delete active projects instead \n--delete-non-active-projects : By default this script will deactivate projects, add this flag to delete non-active projects instead (if this flag is present only non-active projects will be deleted) \n--origins : Defines origin types of projects to delete\n--orgs : A set of orgs upon which to perform delete,be sure to use org slug instead of org display name (use ! for all orgs)\n--scatypes : Defines SCA type/s of projects to deletes \n--products : Defines product/s types of projects to delete\n--delete-empty-orgs : This will delete all orgs that do not have any projects in them \n* Please replace spaces with dashes(-) when entering orgs \n* If entering multiple values use the following format: "value-1 value-2 value-3" \n--after : Only delete projects that were created after a certain date time (in ISO 8601 format, i.e 2023-09-01T00:00:00.000Z)\n--after : Only delete projects that were created before a certain date time (in ISO 8601 format, i.e 2023-09-01T00:00:00.000Z)\n--ignore-keys : An array of key's, if any of these key's are present in a project name then that project will not be targeted for deletion/deactivation
+helpString ='''--help : Returns this page \n--force : By default this script will perform a dry run, add this flag to actually apply changes\n--delete : By default this script will deactivate projects, add this flag to delete active projects instead \n--delete-non-active-projects : By default this script will deactivate projects, add this flag to delete non-active projects instead (if this flag is present only non-active projects will be deleted) \n--origins : Defines origin types of projects to delete\n--orgs : A set of orgs upon which to perform delete,be sure to use org slug instead of org display name (use ! for all orgs)\n--sca-types : Defines SCA type/s of projects to deletes \n--products : Defines product/s types of projects to delete\n--delete-empty-orgs : This will delete all orgs that do not have any projects in them \n* Please replace spaces with dashes(-) when entering orgs \n* If entering multiple values use the following format: "value-1 value-2 value-3" or value-1 value-2 value-3 \n--after : Only delete projects that were created after a certain date time (in ISO 8601 format, i.e 2023-09-01T00:00:00.000Z)\n--before : Only delete projects that were created before a certain date time (in ISO 8601 format, i.e 2023-09-01T00:00:00.000Z)\n--ignore-keys : An array of key's, if any of these key's are present in a project name then that project will not be targeted for deletion/deactivation\n--debug : Logs every project that is scanned
+--no-cache : Always fetch orgs and projects from the API instead of reusing listings cached by a previous run
             '''
 
-#get all user orgs and verify snyk API token
-userOrgs = []
-client = snyk.SnykClient(os.getenv("SNYK_TOKEN"))
-try:
-    userOrgs = client.organizations.all()
-except snyk.errors.SnykHTTPError as err:
-    print("💥 Ran into an error while fetching account details, please check your API token")
-    print( helpString)
-def is_date_between(curr_date_str, before_date_str, after_date_str):
-    # Parse the current date string into a datetime object
-    curr_date = datetime.strptime(curr_date_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-
-    # Parse the before date string into a datetime object if it's not empty
-    if before_date_str:
-        before_date = datetime.strptime(before_date_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-    else:
-        before_date = None
+logger = logging.getLogger("snyk-bulk-delete")
 
-    # Parse the after date string into a datetime object if it's not empty
-    if after_date_str:
-        after_date = datetime.strptime(after_date_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-    else:
-        after_date = None
+#maximum number of snyk API requests in flight at once
+MAX_CONNECTIONS = 16
+
+#number of project actions sent together, snyk has no bulk project endpoint so a batch is a group of concurrent requests
+BATCH_SIZE = 100
+
+#maximum number of snyk API requests per minute, set SNYK_RPM if your token has a different limit
+REQUESTS_PER_MINUTE = int(os.getenv("SNYK_RPM", 1620))
+
+#number of seconds org and project listings are reused from the on disk cache
+CACHE_TTL = 60
+
+#number of seconds a cached project page can still be used by a dry run when the API is unavailable
+CACHE_MAX_STALE = 3600
+
+#get all user orgs and verify snyk API token, a fresh cached listing is reused instead
+def get_user_orgs(cache):
+    userOrgs = cache.get("orgs") if cache is not None else None
+    if userOrgs is not None:
+        return userOrgs
+    client = snyk.SnykClient(os.getenv("SNYK_TOKEN"))
+    try:
+        userOrgs = [Org(currOrg.id, currOrg.slug, currOrg.name) for currOrg in client.organizations.all()]
+    except snyk.errors.SnykHTTPError as err:
+        print("💥 Ran into an error while fetching account details, please check your API token")
+        print( helpString)
+        return []
+    if cache is not None:
+        cache.set("orgs", userOrgs)
+    return userOrgs
+
+#parses an ISO 8601 datetime with the C implemented fromisoformat, datetimes without an offset are treated as UTC
+def parse_date(date_str):
+    parsed = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def is_date_between(curr_date_str, before_date, after_date):
+    # Parse the current date string into a datetime object, the before and after dates are parsed once in main
+    curr_date = parse_date(curr_date_str)
 
     # Check if the current date is between the before and after dates
     if before_date and after_date:
@@ -44,179 +69,281 @@ def is_date_between(curr_date_str, before_date_str, after_date_str):
         # If both before and after dates are empty, return True
         return True
 
-def main(argv):
-    inputOrgs = []
-    products = []
-    scaTypes = []
-    origins = []
-    deleteorgs = False
-    dryrun = True
-    deactivate = True
-    deleteNonActive = False
-    beforeDate = ""
-    afterDate = ""
-    ignoreKeys = []
-
-    
-    #valid input arguments declared here
-    try:
-        opts, args = getopt.getopt(argv, "hofd",["help", "orgs=", "sca-types=", "products=", "origins=", "ignore-keys=", "before=","after=", "force", "delete-empty-orgs", "delete", "delete-non-active-projects"] )
-    except getopt.GetoptError:
-        print("Error parsing input, please check your syntax")
-        sys.exit(2)
-    
-    #process input
-    for opt, arg in opts:
-        if opt == '--help':
-            print(helpString)
-            sys.exit(2)
-        if opt =='--orgs':
-            if arg == "!":
-                inputOrgs = [org.slug for org in userOrgs]
+#compiles the filters into a single predicate, everything that does not depend on the project is resolved once per run
+def compile_project_filter(filters):
+    #filter values are lowercase and only used for membership tests from here on
+    scaTypes = frozenset(filters["sca-types"])
+    origins = frozenset(filters["origins"])
+    products = frozenset(filters["products"])
+    #a single regex finds any of the ignore keys in one scan of the project name
+    ignoreKeys = re.compile("|".join(map(re.escape, filters["ignore-keys"])), re.IGNORECASE) if filters["ignore-keys"] else None
+    beforeDate = filters["before"]
+    afterDate = filters["after"]
+    dates = beforeDate is not None or afterDate is not None
+
+    #returns True when a project does not match the filters and should be left untouched
+    #checks run from cheapest to most expensive and stop at the first one that rejects the project
+    def is_project_skipped(currProject):
+        #project attributes are compared lowercase like the filter values
+        projectType = currProject.type.lower()
+
+        #skip if scatypes are declared and curr project type does not match filter criteria
+        if scaTypes and projectType not in scaTypes:
+            return True
+
+        #skip if origintypes are declared and curr project origin does not match filter criteria
+        if origins and (currProject.origin or "").lower() not in origins:
+            return True
+
+        #skip if products are declared and curr project product does not match filter criteria, the type is only converted when needed
+        if products and convertTypeToProduct(projectType) not in products:
+            return True
+
+        #skip if any of the ignore keys is present in the project name
+        if ignoreKeys is not None and ignoreKeys.search(currProject.name):
+            return True
+
+        #skip if the project was not created between the before/after datetimes, only checked when a datetime was given
+        #the before/after datetimes are validated once in main, a created date that cannot be parsed skips the project
+        if dates:
+            try:
+                if not is_date_between(currProject.created, beforeDate, afterDate):
+                    return True
+            except ValueError:
+                logger.warning("Skipping\033[1;32m %s\u001b[0m, could not parse its created date %s", currProject.name, currProject.created)
+                return True
+
+        return False
+
+    return is_project_skipped
+
+#scans an org, applies the requested action to matching projects and deletes the org if it ends up empty
+async def process_org(sess, throttle, cache, currOrg, is_project_skipped, options, results):
+    logger.info("Processing \033[1;32m\"%s\" \u001b[0morganization", currOrg.name)
+
+    #projects matching the filters are queued here and processed together once the org has been scanned
+    pendingDeactivate = []
+    pendingDelete = []
+    #number of projects in the org, used to detect empty orgs without listing the projects again
+    projectCount = 0
+
+    #cycle through all projects in current org and queue projects that match filter
+    #cached pages are only used by dry runs, a forced run always acts on a live listing
+    listingCache = cache if options["dryrun"] else None
+    async for currProject in iterOrgProjects(sess, throttle, currOrg.id, cache=listingCache, filters=options["list-filters"], allowStale=options["dryrun"]):
+        projectCount += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Org: %s - Project [%s]: %s, Type: %s, Origin: %s", currOrg.name, projectCount, currProject.name, currProject.type, currProject.origin)
+        if projectCount % 100 == 0:
+            logger.info("Org: %s - Scanned %s projects", currOrg.name, projectCount)
+        if options["filters-empty"] or is_project_skipped(currProject):
+            results.projects_skipped += 1
+            continue
+        isActive = currProject.isMonitored
+        #queue active project if filter are meet
+        if isActive and not options["delete-non-active"]:
+            action = "Deactivating" if options["deactivate"] else "Deleting"
+            if options["deactivate"]:
+                pendingDeactivate.append(currProject)
             else:
-                inputOrgs = arg.split()
-        if opt == '--sca-types':
-            scaTypes = [scaType.lower() for scaType in arg.split()]
-        if opt == '--products':
-            products =[product.lower() for product in arg.split()]
-        if opt == '--origins':
-            origins =[origin.lower() for origin in arg.split()]
-        if opt =='--delete-empty-orgs':
-            deleteorgs = True
-        if opt =='--force':
-            dryrun = False
-        if opt =='--delete':
-            deactivate = False
-        if opt =='--delete-non-active-projects':
-            deactivate = False
-            deleteNonActive = True
-        if opt =='--before':
-            beforeDate = arg
-        if opt =='--after':
-            afterDate = arg
-        if opt =='--ignore-keys':
-            ignoreKeys =[key.lower() for key in arg.split()]
+                pendingDelete.append(currProject)
+        #queue non-active project if filters are meet
+        elif not isActive and options["delete-non-active"]:
+            action = "Deleting"
+            pendingDelete.append(currProject)
+        else:
+            results.projects_skipped += 1
+            continue
+        logger.info("    %s\033[1;32m %s\u001b[0m (%s), Project details: \u001b[34mOrigin: %s, Type: %s, Product: %s\u001b[0m", action, currProject.name, currOrg.name, currProject.origin, currProject.type, convertTypeToProduct(currProject.type.lower()))
+
+    #apply queued actions for the org in one batch per action
+    remainingProjects = projectCount
+    for action, pendingProjects in (("deactivate", pendingDeactivate), ("delete", pendingDelete)):
+        if len(pendingProjects) == 0:
+            continue
+        failed = []
+        #actions are sent in batches so only one batch of requests is pending at a time and progress is reported per batch
+        if not options["dryrun"]:
+            for start in range(0, len(pendingProjects), BATCH_SIZE):
+                batch = pendingProjects[start:start + BATCH_SIZE]
+                batchFailed = await applyProjectActions(sess, throttle, currOrg.id, batch, action)
+                failed.extend(batchFailed)
+                #a single batch is already covered by the per-org summary below
+                if len(pendingProjects) > BATCH_SIZE:
+                    logger.info("Org: %s - Applied %s to %s/%s projects (batch %s)", currOrg.name, action, len(batch) - len(batchFailed), len(batch), start // BATCH_SIZE + 1)
+        for project in failed:
+            logger.error("\u001b[0m    💥 Failed to %s project\033[1;32m %s\u001b[0m", action, project.name)
+        if action == "delete":
+            results.projects_deleted += len(pendingProjects) - len(failed)
+        else:
+            results.projects_deactivated += len(pendingProjects) - len(failed)
+        results.projects_failed += len(failed)
+        #dry runs count the deletes they would apply so the empty org preview matches a forced run
+        if action == "delete":
+            remainingProjects -= len(pendingProjects) - len(failed)
+        if options["dryrun"]:
+            logger.info("Would apply %s to %s projects in\033[1;32m %s\u001b[0m", action, len(pendingProjects), currOrg.name)
+        else:
+            status = "✅" if len(failed) == 0 else "💥"
+            logger.info("%s Applied %s to %s/%s projects in\033[1;32m %s\u001b[0m", status, action, len(pendingProjects) - len(failed), len(pendingProjects), currOrg.name)
+        #the cached project listing no longer matches the org once an action went through
+        if cache is not None and not options["dryrun"] and len(failed) < len(pendingProjects):
+            cache.invalidate(f"projects:{currOrg.id}:")
+
+    #if org is empty and --delete-empty-org flag is on
+    if options["delete-empty-orgs"] and remainingProjects == 0:
+        try:
+            if not options["dryrun"]:
+                await deleteOrg(sess, throttle, currOrg.id)
+                if cache is not None:
+                    cache.invalidate("orgs")
+            logger.info("%s\033[1;32m %s\u001b[0m since it is an empty organization", "Would delete" if options["dryrun"] else "✅ Deleted", currOrg.name)
+            results.orgs_deleted += 1
+        except Exception:
+            results.orgs_failed += 1
+            logger.error("💥 Failed to delete\033[1;32m %s\u001b[0m", currOrg.name)
+
+async def main(argv):
+    #valid input arguments declared here, --help prints helpString instead of the generated argparse help
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-h", "--help", action="store_true")
+    for name in ("--orgs", "--sca-types", "--products", "--origins", "--ignore-keys"):
+        parser.add_argument(name, nargs="+", type=str.lower, default=[])
+    parser.add_argument("--before", default="")
+    parser.add_argument("--after", default="")
+    parser.add_argument("--force", action="store_false", dest="dryrun")
+    parser.add_argument("--delete", action="store_true")
+    parser.add_argument("--delete-non-active-projects", action="store_true")
+    parser.add_argument("--delete-empty-orgs", action="store_true")
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--no-cache", action="store_false", dest="cache")
+    args = parser.parse_args(argv)
+    if args.help:
+        print(helpString)
+        sys.exit(2)
+
+    #values can be given as one quoted string ("value-1 value-2") or as separate arguments
+    splitValues = lambda values: [value for arg in values for value in arg.split()]
+
+    #filters select the projects to act on, options control what happens to them
+    filters = {
+        "sca-types": splitValues(args.sca_types),
+        "products": splitValues(args.products),
+        "origins": splitValues(args.origins),
+        "before": args.before,
+        "after": args.after,
+        "ignore-keys": splitValues(args.ignore_keys),
+    }
+    options = {
+        "orgs": splitValues(args.orgs),
+        "dryrun": args.dryrun,
+        "deactivate": not (args.delete or args.delete_non_active_projects),
+        "delete-non-active": args.delete_non_active_projects,
+        "delete-empty-orgs": args.delete_empty_orgs,
+        "debug": args.debug,
+        "cache": args.cache,
+    }
+    inputOrgs = options["orgs"]
+    dryrun = options["dryrun"]
+
     #error handling if no filters declared
-    filtersEmpty = len(scaTypes) == 0 and len(products) == 0 and len(origins) == 0
-    if filtersEmpty and not deleteorgs:
+    filtersEmpty = len(filters["sca-types"]) == 0 and len(filters["products"]) == 0 and len(filters["origins"]) == 0
+    if filtersEmpty and not options["delete-empty-orgs"]:
         print(filtersEmpty)
         print("No settings entered, exiting")
         print(helpString)
         sys.exit(2)
-    
+    options["filters-empty"] = filtersEmpty
+
     #error handling if no orgs declared
     if len(inputOrgs) == 0:
         print("No orgs to process entered, exiting")
         print(helpString)
-    
+
+    #parse the before/after datetimes once instead of once per project
+    try:
+        filters["before"] = parse_date(filters["before"]) if filters["before"] else None
+        filters["after"] = parse_date(filters["after"]) if filters["after"] else None
+    except ValueError:
+        print("error processing before/after datetimes, please check your format")
+        sys.exit(2)
+    is_project_skipped = compile_project_filter(filters)
+
+    #origins and sca types are also sent to the API so only projects that can match are listed, the filter still checks them
+    #--delete-empty-orgs needs every project of an org to tell if it is empty so the listing is not filtered then
+    options["list-filters"] = {}
+    if not options["delete-empty-orgs"]:
+        if filters["origins"]:
+            options["list-filters"]["origins"] = ",".join(filters["origins"])
+        if filters["sca-types"]:
+            options["list-filters"]["types"] = ",".join(filters["sca-types"])
+
     #print dryrun message
     if dryrun:
         print("\033[93mTHIS IS A DRY RUN, NOTHING WILL BE DELETED! USE --FORCE TO APPLY ACTIONS\u001b[0m")
-    
-    #delete functionality
-    for currOrg in userOrgs:
-
-        #if curr org is in list of orgs to process
-        if currOrg.slug in inputOrgs:
-
-            #remove currorg for org proccesing list and print proccesing message
-            inputOrgs.remove(currOrg.slug)
-            print("Processing" + """ \033[1;32m"{}" """.format(currOrg.name) + "\u001b[0morganization")
-
-            #cycle through all projects in current org and delete projects that match filter
-            for currProject in currOrg.projects.all():
-
-    
-                #variables which determine whether project matches criteria to delete, if criteria is empty they will be defined as true
-                scaTypeMatch = False
-                originMatch = False
-                productMatch = False
-                dateMatch = False
-                nameMatch = True
-                isActive = currProject.isMonitored
-
-                #dateMatch validation
-                try:
-                    dateMatch = is_date_between(currProject.created, beforeDate, afterDate)
-                except:
-                    print("error processing before/after datetimes, please check your format")
-                    sys.exit(2)
-                #nameMatch validation
-                for key in ignoreKeys:
-                    if key in currProject.name:
-                        nameMatch = False
-                
-                #if scatypes are not declared or curr project type matches filter criteria then return true
-                if len(scaTypes) != 0:
-                    if currProject.type in scaTypes:
-                        scaTypeMatch = True
-                else:
-                    scaTypeMatch = True
-
-                #if origintypes are not declared or curr project origin matches filter criteria then return true
-                if len(origins) != 0:
-                    if currProject.origin in origins:
-                        originMatch = True
-                else:
-                    originMatch = True
-
-                #if producttypes are not declared or curr project product matches filter criteria then return true
-                currProjectProductType = convertTypeToProduct(currProject.type)
-                if len(products) != 0:
-                    if currProjectProductType in products:
-                        productMatch = True
-                else:
-                    productMatch = True  
-                
-                #delete active project if filter are meet
-                if scaTypeMatch and originMatch and productMatch and isActive and not filtersEmpty and not deleteNonActive and dateMatch and nameMatch:
-                    currProjectDetails = f"Origin: {currProject.origin}, Type: {currProject.type}, Product: {currProjectProductType}"
-                    action =  "Deactivating" if deactivate else "Deleting"
-                    spinner = yaspin(text=f"{action}\033[1;32m {currProject.name}", color="yellow")
-                    spinner.write(f"\u001b[0m    Processing project: \u001b[34m{currProjectDetails}\u001b[0m, Status Below👇")
-                    spinner.start()
-                    try:
-                        if not dryrun:
-                            if not deactivate:
-                                currProject.delete()
-                            else:
-                                currProject.deactivate()
-                        spinner.ok("✅ ")
-                    except exception as e:
-                        spinner.fail("💥 ")
-                #delete non-active project if filters are meet
-                if scaTypeMatch and originMatch and productMatch and (not isActive) and deleteNonActive and not filtersEmpty and dateMatch and nameMatch:
-                    currProjectDetails = f"Origin: {currProject.origin}, Type: {currProject.type}, Product: {currProjectProductType}"
-                    spinner = yaspin(text=f"Deleting\033[1;32m {currProject.name}", color="yellow")
-                    spinner.write(f"\u001b[0m    Processing project: \u001b[34m{currProjectDetails}\u001b[0m, Status Below👇")
-                    spinner.start()
-                    try:
-                        if not dryrun:
-                                currProject.delete()
-                        spinner.ok("✅ ")
-                    except exception as e:
-                        spinner.fail("💥 ")
-            #if org is empty and --delete-empty-org flag is on
-            if len(currOrg.projects.all()) == 0 and deleteorgs:
-                spinner = yaspin(text="Deleting\033[1;32m {}\u001b[0m since it is an empty organization".format(currOrg.name), color="yellow")
-                spinner.start()
-                try:
-                    if not dryrun:
-                        client.delete(f'org/{currOrg.id}')
-                    spinner.ok("✅ ")
-                    spinner.stop()
-                except:
-                    spinner.fail("💥 ")
-                    spinner.stop()                       
+
+    #listings are cached per API token so runs with different tokens never share orgs or projects
+    cache = None
+    if options["cache"]:
+        tokenHash = hashlib.sha256(os.getenv("SNYK_TOKEN", "").encode()).hexdigest()[:16]
+        try:
+            cache = ListingCache(os.path.expanduser(f"~/.snyk-bulk-delete-cache-{tokenHash}"), CACHE_TTL, CACHE_MAX_STALE)
+        except dbm.error as err:
+            print(f"⚠️ Could not open the listing cache ({err}), continuing without it")
+    userOrgs = get_user_orgs(cache)
+
+    #select the orgs to process once through a slug lookup, before any work is scheduled
+    #slugs are matched lowercase since --orgs is lowercased
+    orgsBySlug = {currOrg.slug.lower(): currOrg for currOrg in userOrgs}
+    if inputOrgs == ["!"]:
+        targetOrgs = list(orgsBySlug.values())
+        missingOrgs = []
+    else:
+        targetOrgs = [orgsBySlug[slug] for slug in dict.fromkeys(inputOrgs) if slug in orgsBySlug]
+        missingOrgs = [slug for slug in inputOrgs if slug not in orgsBySlug]
+
+    #delete functionality, orgs are processed concurrently and every API call shares one bounded connection pool
+    #idle connections are kept alive between pages and batches so TLS handshakes are paid once per connection
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, keepalive_timeout=60, ttl_dns_cache=300)
+    sessionHeaders = {
+        "Authorization": f"token {os.getenv('SNYK_TOKEN')}",
+        "Content-Type": "application/json"
+    }
+    throttle = Throttle(MAX_CONNECTIONS, REQUESTS_PER_MINUTE)
+    results = Results()
+    with yaspin(text=f"Processing {len(targetOrgs)} organizations", color="yellow") as spinner:
+        async with aiohttp.ClientSession(headers=sessionHeaders, connector=connector, raise_for_status=True) as sess:
+            #the handler is tied to this run's spinner so it is removed again once the run is over
+            spinnerHandler = SpinnerHandler(spinner)
+            logger.addHandler(spinnerHandler)
+            logger.setLevel(logging.DEBUG if options["debug"] else logging.INFO)
+            try:
+                #an error in one org (i.e. a 403 on its listing) is reported and does not stop the other orgs
+                outcomes = await asyncio.gather(*[process_org(sess, throttle, cache, currOrg, is_project_skipped, options, results) for currOrg in targetOrgs], return_exceptions=True)
+                for currOrg, outcome in zip(targetOrgs, outcomes):
+                    if isinstance(outcome, Exception):
+                        results.orgs_errored += 1
+                        logger.error("💥 Failed to process\033[1;32m %s\u001b[0m: %s", currOrg.name, outcome)
+            finally:
+                logger.removeHandler(spinnerHandler)
+                spinnerHandler.close()
+                if cache is not None:
+                    cache.close()
+
     #process input orgs which didnt have a match
-    if len(inputOrgs) != 0:
-        print("\033[1;32m{}\u001b[0m are organizations which do not exist or you don't have access to them, please check your spelling, insure that spaces are replaced with dashes, and that you are using org slugs rather then display names".format(inputOrgs))
-                
+    if len(missingOrgs) != 0:
+        print("\033[1;32m{}\u001b[0m are organizations which do not exist or you don't have access to them, please check your spelling, insure that spaces are replaced with dashes, and that you are using org slugs rather then display names".format(missingOrgs))
+
+    #print a summary of the actions applied, in a dry run deletes and deactivations are only what would have been applied
+    for field in dataclasses.fields(results):
+        i_type, action = field.name.split("_")
+        if dryrun and action in ("deactivated", "deleted"):
+            action = f"would be {action}"
+        print(f"{i_type.capitalize()} - {action.capitalize()}: {getattr(results, field.name)}")
+
     if dryrun:
         print("\033[93mDRY RUN COMPLETE NOTHING DELETED")
 
 
-                    
-            
-main(sys.argv[1:])
-
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))